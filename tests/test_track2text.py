@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+import track2text
+
+
+def write_gpx(body: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=".gpx")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(
+            '<?xml version="1.0"?>\n'
+            '<gpx xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>\n'
+            f"{body}\n"
+            "</trkseg></trk></gpx>\n"
+        )
+    return path
+
+
+class ScanGpxPointsTest(unittest.TestCase):
+    def scan(self, body: str) -> track2text.Track:
+        path = write_gpx(body)
+        self.addCleanup(os.remove, path)
+        return track2text.scan_gpx_points(path)
+
+    def test_reads_bare_lat_lon(self):
+        track = self.scan('<trkpt lat="50.5" lon="7.25"></trkpt>')
+        self.assertEqual(list(track.lat), [50.5])
+        self.assertEqual(list(track.lon), [7.25])
+
+    def test_ignores_prefixed_attributes(self):
+        track = self.scan(
+            '<trkpt foo:data-lat="99" data-lon="98" lat="5" lon="6"></trkpt>'
+        )
+        self.assertEqual(list(track.lat), [5.0])
+        self.assertEqual(list(track.lon), [6.0])
+
+
+class LoadConfigTest(unittest.TestCase):
+    def test_strips_surrounding_quotes(self):
+        fd, path = tempfile.mkstemp(suffix=".txt")
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(
+                'NOMINATIM_USER_AGENT="track2text/1.0 (contact: me)"\n'
+                "TRACK2TEXT_GEOCODER='photon'\n"
+                "TRACK2TEXT_MIN_DIST_M=30\n"
+            )
+        config = track2text.load_config(path)
+        self.assertEqual(
+            config["NOMINATIM_USER_AGENT"], "track2text/1.0 (contact: me)"
+        )
+        self.assertEqual(config["TRACK2TEXT_GEOCODER"], "photon")
+        self.assertEqual(config["TRACK2TEXT_MIN_DIST_M"], "30")
+
+
+class PickFirstTest(unittest.TestCase):
+    def test_prefers_higher_ranked_key(self):
+        address = {"path": "Waldweg", "road": "Hauptstrasse"}
+        self.assertEqual(
+            track2text.pick_first(address, track2text.ROAD_PRIORITY),
+            "Hauptstrasse",
+        )
+
+    def test_skips_keys_without_value(self):
+        # Same as the former per-key address.get(key) probe: a None value
+        # falls through to the next key.
+        address = {"road": None, "cycleway": "Rheinradweg"}
+        self.assertEqual(
+            track2text.pick_first(address, track2text.ROAD_PRIORITY),
+            "Rheinradweg",
+        )
+        self.assertIsNone(
+            track2text.pick_first({"road": None}, track2text.ROAD_PRIORITY)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,26 +3,62 @@
 
 from __future__ import annotations
 
+import base64
+import gzip
+import http.client
 import json
 import math
+import mmap
 import os
+import re
+import sqlite3
 import sys
+import threading
 import time
+import urllib.error
 import urllib.parse
 import urllib.request
 import xml.etree.ElementTree as ET
 import argparse
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Tuple
+import bisect
+from array import array
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 try:
-    from fitparse import FitFile
+    import orjson
 except Exception:  # pragma: no cover - optional dependency
-    FitFile = None
+    orjson = None
+
+# Importing numba and compiling costs more than it saves on typical tracks
+# of a few thousand points, so the JIT is opt-in (TRACK2TEXT_NUMBA=1).
+njit = None
+if os.environ.get("TRACK2TEXT_NUMBA") == "1":
+    try:
+        from numba import njit
+    except Exception:  # pragma: no cover - optional dependency
+        pass
+if njit is None:
+
+    def njit(*args, **kwargs):
+        def decorate(func):
+            return func
+
+        return decorate
 
 
 INBOX_DIR = os.path.join(os.path.dirname(__file__), "inbox")
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.txt")
+GEOCODE_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "track2text",
+    "geocode.sqlite",
+)
 
 ANSI_CODES = {
     "reset": "\x1b[0m",
@@ -34,6 +70,7 @@ ANSI_CODES = {
 }
 
 
+@lru_cache(maxsize=None)
 def color_enabled() -> bool:
     if not sys.stdout.isatty():
         return False
@@ -62,19 +99,13 @@ def env_first(keys: Iterable[str], default: str) -> str:
     return default
 
 
-USER_AGENT = env_first(
-    ["NOMINATIM_USER_AGENT"],
-    "track2text/1.0 (local script; contact: none)",
-)
-GEOCODER = env_first(["TRACK2TEXT_GEOCODER", "GPXER_GEOCODER"], "nominatim").lower()
-LOCALITY_GEOCODER = env_first(
-    ["TRACK2TEXT_LOCALITY_GEOCODER", "GPXER_LOCALITY_GEOCODER"],
-    "photon",
-).lower()
+DEFAULT_USER_AGENT = "track2text/1.0 (local script; contact: none)"
 
 
-@dataclass
+@dataclass(frozen=True)
 class Point:
+    __slots__ = ("lat", "lon")
+
     lat: float
     lon: float
 
@@ -87,11 +118,12 @@ def newest_track_file(inbox_dir: str, lang: str) -> str:
             else f"Inbox folder not found: {inbox_dir}"
         )
         raise FileNotFoundError(msg)
-    track_files = [
-        os.path.join(inbox_dir, f)
-        for f in os.listdir(inbox_dir)
-        if f.lower().endswith((".gpx", ".fit"))
-    ]
+    with os.scandir(inbox_dir) as entries:
+        track_files = [
+            entry
+            for entry in entries
+            if entry.name.lower().endswith((".gpx", ".fit")) and entry.is_file()
+        ]
     if not track_files:
         msg = (
             "Keine GPX- oder FIT-Dateien im inbox-Ordner gefunden."
@@ -99,30 +131,117 @@ def newest_track_file(inbox_dir: str, lang: str) -> str:
             else "No GPX or FIT files found in the inbox folder."
         )
         raise FileNotFoundError(msg)
-    return max(track_files, key=os.path.getmtime)
+    return max(track_files, key=lambda entry: entry.stat().st_mtime).path
 
 
-def parse_gpx_points(gpx_path: str) -> List[Point]:
-    tree = ET.parse(gpx_path)
-    root = tree.getroot()
+@dataclass
+class Track:
+    # Coordinates are kept as two flat float arrays rather than one Point
+    # object per track point.
+    lat: array = field(default_factory=lambda: array("d"))
+    lon: array = field(default_factory=lambda: array("d"))
+    _trig: Optional[Tuple[array, array, array]] = field(
+        default=None, repr=False, compare=False
+    )
 
-    pts = []
-    for el in root.findall(".//{*}trkpt"):
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def append(self, lat: float, lon: float) -> None:
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self._trig = None
+
+    def trig(self) -> Tuple[array, array, array]:
+        # Latitude/longitude in radians and cos(latitude), computed once and
+        # shared by every distance pass over the track.
+        if self._trig is None:
+            lat_r = array("d", map(math.radians, self.lat))
+            lon_r = array("d", map(math.radians, self.lon))
+            self._trig = (lat_r, lon_r, array("d", map(math.cos, lat_r)))
+        return self._trig
+
+    def point(self, idx: int) -> Point:
+        return Point(self.lat[idx], self.lon[idx])
+
+
+GPX_POINT_RE = re.compile(rb"<(trkpt|rtept)\s([^>]*)>")
+# Only the bare attribute names; "data-lat" or "foo:lat" must not match.
+GPX_LAT_RE = re.compile(rb"""(?:^|\s)lat\s*=\s*["']([^"']*)["']""")
+GPX_LON_RE = re.compile(rb"""(?:^|\s)lon\s*=\s*["']([^"']*)["']""")
+
+
+def scan_gpx_points(gpx_path: str) -> Track:
+    # GPX point tags are regular enough to pick lat/lon straight out of the
+    # raw bytes without building any XML elements. Returns an empty track
+    # when nothing usable is found, so the caller can fall back to the XML
+    # parser for unusual files (namespace prefixes, entities, comments or
+    # CDATA sections that may hide point tags, ...).
+    track = Track()
+    route = Track()
+    with open(gpx_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return track
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data.find(b"<!--") != -1 or data.find(b"<![CDATA[") != -1:
+                return track
+            try:
+                for match in GPX_POINT_RE.finditer(data):
+                    attrs = match.group(2)
+                    lat = GPX_LAT_RE.search(attrs)
+                    lon = GPX_LON_RE.search(attrs)
+                    if lat is None or lon is None:
+                        continue
+                    target = track if match.group(1) == b"trkpt" else route
+                    target.append(float(lat.group(1)), float(lon.group(1)))
+            except ValueError:
+                return Track()
+    return track if track else route
+
+
+def parse_gpx_points(gpx_path: str) -> Track:
+    # Stream the file and drop each point element once it has been read, so
+    # large GPX files never have to fit into memory as a full tree. Track
+    # and route points are collected in the same pass.
+    track = Track()
+    route = Track()
+
+    def read_point(el) -> None:
+        target = track if el.tag.rsplit("}", 1)[-1] == "trkpt" else route
         lat = el.get("lat")
         lon = el.get("lon")
-        if lat is None or lon is None:
-            continue
-        pts.append(Point(float(lat), float(lon)))
+        if lat is not None and lon is not None:
+            target.append(float(lat), float(lon))
+        el.clear()
 
-    if not pts:
-        for el in root.findall(".//{*}rtept"):
-            lat = el.get("lat")
-            lon = el.get("lon")
-            if lat is None or lon is None:
+    # Only needed when scan_gpx_points found nothing, so imported lazily.
+    try:
+        from lxml import etree as lxml_etree
+    except Exception:  # pragma: no cover - optional dependency
+        lxml_etree = None
+
+    if lxml_etree is not None:
+        # libxml2 filters the point elements itself.
+        for _, el in lxml_etree.iterparse(
+            gpx_path, events=("end",), tag=("{*}trkpt", "{*}rtept")
+        ):
+            read_point(el)
+            # Detach the already processed siblings from the parent as well.
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+    else:
+        parents = []
+        for event, el in ET.iterparse(gpx_path, events=("start", "end")):
+            if event == "start":
+                parents.append(el)
                 continue
-            pts.append(Point(float(lat), float(lon)))
+            parents.pop()
+            if el.tag.rsplit("}", 1)[-1] in ("trkpt", "rtept"):
+                read_point(el)
+                if parents:
+                    parents[-1].remove(el)
 
-    return pts
+    return track if track else route
 
 
 def semicircles_to_degrees(value: float) -> float:
@@ -131,52 +250,51 @@ def semicircles_to_degrees(value: float) -> float:
 
 @dataclass
 class FieldSummary:
+    # Numeric values are only collected here; min/max/avg are computed once
+    # when the summary is formatted.
     count: int = 0
-    numeric_count: int = 0
-    total: float = 0.0
-    min_value: Optional[float] = None
-    max_value: Optional[float] = None
-    last_value: Optional[str] = None
+    numbers: array = field(default_factory=lambda: array("d"))
+    last_value: object = None
     unit: Optional[str] = None
     unique_values: Optional[set] = None
 
     def add_value(self, value, unit: Optional[str]) -> None:
         self.count += 1
+        self.last_value = value
         if unit and not self.unit:
             self.unit = unit
         if isinstance(value, (int, float)):
-            self.numeric_count += 1
-            self.total += float(value)
-            if self.min_value is None or value < self.min_value:
-                self.min_value = float(value)
-            if self.max_value is None or value > self.max_value:
-                self.max_value = float(value)
-            self.last_value = f"{value}"
+            self.numbers.append(value)
             return
         if self.unique_values is None:
             self.unique_values = set()
         if len(self.unique_values) < 5:
             self.unique_values.add(str(value))
-        self.last_value = str(value)
 
     def format_value(self) -> str:
-        if self.numeric_count > 1:
-            avg = self.total / self.numeric_count
+        numbers = self.numbers
+        if len(numbers) > 1:
+            avg = sum(numbers) / len(numbers)
             unit = f" {self.unit}" if self.unit else ""
-            return f"min={self.min_value}, max={self.max_value}, avg={avg:.2f}{unit}"
-        if self.numeric_count == 1:
+            return f"min={min(numbers)}, max={max(numbers)}, avg={avg:.2f}{unit}"
+        if len(numbers) == 1:
             unit = f" {self.unit}" if self.unit else ""
             return f"{self.last_value}{unit}"
         if self.unique_values:
             values = ", ".join(sorted(self.unique_values))
             suffix = "" if self.count <= len(self.unique_values) else "..."
             return f"{values}{suffix}"
-        return self.last_value or ""
+        return "" if self.last_value is None else str(self.last_value)
 
 
-def ensure_fitparse(lang: str) -> None:
+def ensure_fitparse(lang: str):
+    # Imported on first use, so GPX runs never load it.
+    try:
+        from fitparse import FitFile
+    except Exception:  # pragma: no cover - optional dependency
+        FitFile = None
     if FitFile is not None:
-        return
+        return FitFile
     msg = (
         "Fehler: fitparse ist nicht installiert. Bitte `pip install -r requirements.txt` ausfuehren."
         if lang == "DE"
@@ -238,12 +356,30 @@ def format_scalar(
     return f"{formatted} {unit_label}".rstrip() if unit_label else formatted
 
 
+SESSION_FIELDS = (
+    "total_timer_time",
+    "total_elapsed_time",
+    "total_ascent",
+    "total_descent",
+    "max_grade",
+    "max_altitude",
+    "max_elevation",
+    "avg_power",
+    "total_distance",
+    "avg_speed",
+    "max_speed",
+    "avg_heart_rate",
+    "max_heart_rate",
+    "avg_cadence",
+)
+
+
 def parse_fit_points_and_summary(
-    fit_path: str, lang: str
-) -> Tuple[List[Point], List[str], List[str], Dict[str, object]]:
-    ensure_fitparse(lang)
+    fit_path: str, lang: str, collect_debug: bool = False
+) -> Tuple[Track, List[str], List[str], Dict[str, object]]:
+    FitFile = ensure_fitparse(lang)
     fitfile = FitFile(fit_path)
-    points: List[Point] = []
+    track = Track()
     session_values: Dict[str, Tuple[Optional[float], Optional[str]]] = {}
     record_temps: List[float] = []
     full_summary: Dict[str, Dict[str, FieldSummary]] = {}
@@ -251,9 +387,22 @@ def parse_fit_points_and_summary(
 
     for message in fitfile.get_messages():
         message_name = message.name
-        message_counts[message_name] = message_counts.get(message_name, 0) + 1
-        fields = full_summary.setdefault(message_name, {})
-        field_map = {field.name: field for field in message}
+        if collect_debug:
+            message_counts[message_name] = message_counts.get(message_name, 0) + 1
+            fields = full_summary.setdefault(message_name, {})
+            # One pass over the fields builds the lookup map and the debug
+            # summary together.
+            field_map = {}
+            for field in message:
+                field_map[field.name] = field
+                if field.value is None:
+                    continue
+                field_summary = fields.get(field.name)
+                if field_summary is None:
+                    field_summary = fields[field.name] = FieldSummary()
+                field_summary.add_value(field.value, field.units)
+        else:
+            field_map = {field.name: field for field in message}
         lat_field = field_map.get("position_lat")
         lon_field = field_map.get("position_long")
         if (
@@ -262,41 +411,19 @@ def parse_fit_points_and_summary(
             and lat_field.value is not None
             and lon_field.value is not None
         ):
-            points.append(
-                Point(
-                    semicircles_to_degrees(lat_field.value),
-                    semicircles_to_degrees(lon_field.value),
-                )
+            track.append(
+                semicircles_to_degrees(lat_field.value),
+                semicircles_to_degrees(lon_field.value),
             )
         if message_name == "record":
             temp_field = field_map.get("temperature")
             if temp_field and temp_field.value is not None:
                 record_temps.append(float(temp_field.value))
         if message_name == "session":
-            for field_name in (
-                "total_timer_time",
-                "total_elapsed_time",
-                "total_ascent",
-                "total_descent",
-                "max_grade",
-                "max_altitude",
-                "max_elevation",
-                "avg_power",
-                "total_distance",
-                "avg_speed",
-                "max_speed",
-                "avg_heart_rate",
-                "max_heart_rate",
-                "avg_cadence",
-            ):
+            for field_name in SESSION_FIELDS:
                 field = field_map.get(field_name)
                 if field and field.value is not None:
                     session_values[field_name] = (field.value, field.units)
-        for field in message:
-            if field.value is None:
-                continue
-            field_summary = fields.setdefault(field.name, FieldSummary())
-            field_summary.add_value(field.value, field.units)
 
     summary_lines: List[str] = []
     debug_lines: List[str] = []
@@ -444,6 +571,9 @@ def parse_fit_points_and_summary(
                 f"/{avg_temp[0] if avg_temp else '-'} C"
             )
 
+    if not collect_debug:
+        return track, summary_lines, debug_lines, summary_data
+
     debug_title = "Debug" if lang == "EN" else "Debug"
     debug_lines.append(debug_title)
     debug_lines.append("-" * len(debug_title))
@@ -462,11 +592,14 @@ def parse_fit_points_and_summary(
     if debug_lines and debug_lines[-1] == "":
         debug_lines.pop()
 
-    return points, summary_lines, debug_lines, summary_data
+    return track, summary_lines, debug_lines, summary_data
+
+
+EARTH_RADIUS_M = 6371000.0
 
 
 def haversine_m(a: Point, b: Point) -> float:
-    r = 6371000.0
+    r = EARTH_RADIUS_M
     lat1 = math.radians(a.lat)
     lat2 = math.radians(b.lat)
     dlat = lat2 - lat1
@@ -478,67 +611,372 @@ def haversine_m(a: Point, b: Point) -> float:
     return 2 * r * math.asin(math.sqrt(s))
 
 
-def downsample(points: List[Point], min_dist_m: float) -> List[Point]:
-    if not points:
+@njit(fastmath=True, cache=True)
+def _haversine_array(lat, lon, cos_lat, out) -> None:
+    for i in range(1, len(lat)):
+        s = (
+            math.sin((lat[i] - lat[i - 1]) / 2) ** 2
+            + cos_lat[i - 1] * cos_lat[i] * math.sin((lon[i] - lon[i - 1]) / 2) ** 2
+        )
+        out[i - 1] = 2 * EARTH_RADIUS_M * math.asin(math.sqrt(s))
+
+
+def segment_distances_m(track: Track) -> array:
+    if len(track) < 2:
+        return array("d")
+    lat, lon, cos_lat = track.trig()
+    dists = array("d", [0.0]) * (len(track) - 1)
+    _haversine_array(lat, lon, cos_lat, dists)
+    return dists
+
+
+@njit(fastmath=True, cache=True)
+def cheap_ruler(mean_lat: float) -> Tuple[float, float]:
+    # Meters per degree of longitude and latitude around mean_lat on the
+    # WGS84 ellipsoid (Mapbox cheap-ruler series).
+    cos1 = math.cos(math.radians(mean_lat))
+    cos2 = 2 * cos1 * cos1 - 1
+    cos3 = 2 * cos1 * cos2 - cos1
+    cos4 = 2 * cos1 * cos3 - cos2
+    cos5 = 2 * cos1 * cos4 - cos3
+    kx = 1000.0 * (111.41513 * cos1 - 0.09455 * cos3 + 0.00012 * cos5)
+    ky = 1000.0 * (111.13209 - 0.56605 * cos2 + 0.0012 * cos4)
+    return kx, ky
+
+
+@njit(fastmath=True, cache=True)
+def _approx_dist_array(lat, lon, kx, ky, out) -> None:
+    for i in range(1, len(lat)):
+        out[i - 1] = math.hypot(kx * (lon[i] - lon[i - 1]), ky * (lat[i] - lat[i - 1]))
+
+
+def approx_segment_distances_m(track: Track) -> array:
+    # One cos() for the whole track and plain multiplies per segment, on
+    # degrees directly. Accurate to well under a meter for the short
+    # segments used in sampling; route_distance_m() keeps the haversine.
+    if len(track) < 2:
+        return array("d")
+    kx, ky = cheap_ruler(math.fsum(track.lat) / len(track))
+    dists = array("d", [0.0]) * (len(track) - 1)
+    _approx_dist_array(track.lat, track.lon, kx, ky, dists)
+    return dists
+
+
+def cumulative_distances_m(track: Track) -> List[float]:
+    return list(
+        itertools.accumulate(approx_segment_distances_m(track), initial=0.0)
+    )
+
+
+def downsample_indices(cumulative: List[float], min_dist_m: float) -> List[int]:
+    n = len(cumulative)
+    if n == 0:
         return []
-    keep = [points[0]]
-    last = points[0]
-    for p in points[1:]:
-        if haversine_m(last, p) >= min_dist_m:
-            keep.append(p)
-            last = p
-    if keep[-1] != points[-1]:
-        keep.append(points[-1])
-    return keep
-
-
-def sample_points(points: List[Point], target_max: int = 200) -> List[Point]:
+    if min_dist_m <= 0:
+        return list(range(n))
+    # Jump straight to the next point at least min_dist_m further along the
+    # track; the tail shorter than min_dist_m is never walked.
+    total = cumulative[-1]
+    indices = [0]
+    target = min_dist_m
+    while target < total:
+        idx = bisect.bisect_left(cumulative, target, indices[-1] + 1)
+        indices.append(idx)
+        target = cumulative[idx] + min_dist_m
+    if indices[-1] != n - 1:
+        indices.append(n - 1)
+    return indices
+
+
+def section_breaks(cumulative: List[float], section_m: float) -> Dict[int, int]:
+    # Maps the index of the first sample at or beyond each section boundary
+    # to the km marker shown for it. Boundaries that land on the same sample
+    # move on to the next one instead of replacing each other.
+    breaks: Dict[int, int] = {}
+    if section_m <= 0 or not cumulative:
+        return breaks
+    k = 1
+    last_idx = -1
+    while k * section_m <= cumulative[-1]:
+        idx = max(bisect.bisect_left(cumulative, k * section_m), last_idx + 1)
+        if idx >= len(cumulative):
+            break
+        breaks[idx] = int(k * section_m / 1000.0)
+        last_idx = idx
+        k += 1
+    return breaks
+
+
+Plane = Tuple[array, array]
+
+
+def to_plane(points: List[Point]) -> Plane:
+    # Project to meters with the cheap-ruler scale around the mean latitude;
+    # accurate enough for the point-to-chord distances used by RDP.
+    if not points:
+        return array("d"), array("d")
+    kx, ky = cheap_ruler(math.fsum(p.lat for p in points) / len(points))
+    x = array("d", (kx * p.lon for p in points))
+    y = array("d", (ky * p.lat for p in points))
+    return x, y
+
+
+@njit(fastmath=True, cache=True)
+def _rdp_mask(x, y, epsilon, keep) -> None:
+    # Ramer-Douglas-Peucker with an explicit stack; marks kept indices.
+    n = len(x)
+    keep[0] = 1
+    keep[n - 1] = 1
+    stack = [(0, n - 1)]
+    while len(stack) > 0:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        cx = x[end] - x[start]
+        cy = y[end] - y[start]
+        chord_len = math.hypot(cx, cy)
+        max_dist = -1.0
+        max_idx = start
+        for i in range(start + 1, end):
+            px = x[i] - x[start]
+            py = y[i] - y[start]
+            if chord_len == 0.0:
+                dist = math.hypot(px, py)
+            else:
+                dist = abs(px * cy - py * cx) / chord_len
+            if dist > max_dist:
+                max_dist = dist
+                max_idx = i
+        if max_dist > epsilon:
+            keep[max_idx] = 1
+            stack.append((start, max_idx))
+            stack.append((max_idx, end))
+
+
+def rdp(xy: Plane, epsilon: float) -> List[int]:
+    n = len(xy[0])
+    if n < 3:
+        return list(range(n))
+    keep = bytearray(n)
+    _rdp_mask(xy[0], xy[1], epsilon, keep)
+    return [i for i, flag in enumerate(keep) if flag]
+
+
+def fill_gaps(cumulative: List[float], kept: List[int], max_gap_m: float) -> List[int]:
+    # Adds indices between the sorted kept ones until no two neighbors are
+    # more than max_gap_m apart (or directly adjacent).
+    filled = [kept[0]]
+    for nxt in kept[1:]:
+        cur = filled[-1]
+        while cur + 1 < nxt and cumulative[nxt] - cumulative[cur] > max_gap_m:
+            # The furthest index still within max_gap_m of the current one.
+            far = bisect.bisect_right(
+                cumulative, cumulative[cur] + max_gap_m, cur + 1, nxt
+            )
+            cur = max(far - 1, cur + 1)
+            filled.append(cur)
+        filled.append(nxt)
+    return filled
+
+
+def sample_indices(
+    track: Track,
+    cumulative: List[float],
+    target_max: int = 200,
+    min_dist_m: float = 50.0,
+    section_m: float = 0.0,
+) -> List[int]:
+    # Returns sorted track indices. RDP alone would drop every sample on a
+    # straight stretch, so a few samples are kept regardless of the shape.
+    if target_max <= 1:
+        return list(range(min(len(track), max(target_max, 0))))
+    candidates = downsample_indices(cumulative, min_dist_m)
+    if len(candidates) <= 2:
+        return candidates
+    cand_cumulative = [cumulative[i] for i in candidates]
+    total = cand_cumulative[-1]
+
+    # Both ends and the first candidate at or after each section boundary,
+    # so every section marker gets a sample of its own.
+    fixed = {0, len(candidates) - 1}
+    if section_m > 0:
+        k = 1
+        while k * section_m <= total:
+            fixed.add(bisect.bisect_left(cand_cumulative, k * section_m))
+            k += 1
+    fixed_list = sorted(fixed)
+    if len(fixed_list) > target_max:
+        step = (len(fixed_list) - 1) / (target_max - 1)
+        fixed_list = sorted({fixed_list[round(i * step)] for i in range(target_max)})
+
+    # Cap the gap between samples on straight stretches; about half of the
+    # budget goes there, the rest is left for the corners.
+    max_gap_m = max(2.0 * total / target_max, min_dist_m)
+    forced = fill_gaps(cand_cumulative, fixed_list, max_gap_m)
+    while len(forced) > target_max:
+        max_gap_m *= 2
+        forced = fill_gaps(cand_cumulative, fixed_list, max_gap_m)
+    forced_set = set(forced)
+
+    # Keep the shape-defining vertices on top; widen the RDP tolerance
+    # until everything fits into target_max samples.
+    xy = to_plane([track.point(i) for i in candidates])
+
+    def simplify(epsilon: float) -> List[int]:
+        return sorted(forced_set.union(rdp(xy, epsilon)))
+
+    epsilon = 20.0
+    kept = simplify(epsilon)
+    if len(kept) > target_max:
+        low, high = epsilon, epsilon * 2
+        kept = simplify(high)
+        while len(kept) > target_max:
+            low, high = high, high * 2
+            kept = simplify(high)
+        while high - low > 1.0:
+            mid = (low + high) / 2
+            mid_kept = simplify(mid)
+            if len(mid_kept) > target_max:
+                low = mid
+            else:
+                high = mid
+                kept = mid_kept
+    return [candidates[i] for i in kept]
+
+
+_http_local = threading.local()
+
+
+@lru_cache(maxsize=None)
+def http_proxy(scheme: str, host: str) -> Optional[urllib.parse.SplitResult]:
+    # Honors the same proxy settings (http_proxy, https_proxy, no_proxy, ...)
+    # as urlopen.
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    if "://" not in proxy:
+        proxy = f"http://{proxy}"
+    return urllib.parse.urlsplit(proxy)
+
+
+def proxy_headers(proxy: urllib.parse.SplitResult) -> Dict[str, str]:
+    if proxy.username is None:
+        return {}
+    credentials = (
+        f"{urllib.parse.unquote(proxy.username)}:"
+        f"{urllib.parse.unquote(proxy.password or '')}"
+    )
+    token = base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+    return {"Proxy-Authorization": f"Basic {token}"}
+
+
+def http_connection(
+    scheme: str, host: str, timeout: float
+) -> http.client.HTTPConnection:
+    # One keep-alive connection per host and thread, so successive requests
+    # skip the TCP/TLS handshake.
+    connections = getattr(_http_local, "connections", None)
+    if connections is None:
+        connections = _http_local.connections = {}
+    conn = connections.get((scheme, host))
+    if conn is None:
+        conn_class = (
+            http.client.HTTPConnection
+            if scheme == "http"
+            else http.client.HTTPSConnection
+        )
+        proxy = http_proxy(scheme, host)
+        if proxy is None:
+            conn = conn_class(host, timeout=timeout)
+        elif scheme == "https":
+            # TLS to the target host through a CONNECT tunnel.
+            conn = conn_class(proxy.hostname, proxy.port or 80, timeout=timeout)
+            conn.set_tunnel(host, headers=proxy_headers(proxy))
+        else:
+            conn = conn_class(proxy.hostname, proxy.port or 80, timeout=timeout)
+        connections[(scheme, host)] = conn
+    return conn
+
+
+def close_http_connection(scheme: str, host: str) -> None:
+    connections = getattr(_http_local, "connections", {})
+    conn = connections.pop((scheme, host), None)
+    if conn is not None:
+        conn.close()
+
+
+def http_get(
+    parts: urllib.parse.SplitResult, timeout: float, user_agent: str
+) -> Tuple[http.client.HTTPResponse, bytes]:
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    headers = {"User-Agent": user_agent, "Accept-Encoding": "gzip"}
+    proxy = http_proxy(parts.scheme, parts.netloc)
+    if proxy is not None and parts.scheme == "http":
+        # Plain HTTP proxies take the absolute URL in the request line.
+        path = f"{parts.scheme}://{parts.netloc}{path}"
+        headers.update(proxy_headers(proxy))
+    conn = http_connection(parts.scheme, parts.netloc, timeout)
+    reused = conn.sock is not None
     try:
-        min_dist = float(
-            env_first(["TRACK2TEXT_MIN_DIST_M", "GPXER_MIN_DIST_M"], "50")
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+        except (ConnectionError, http.client.HTTPException):
+            if not reused:
+                raise
+            # The server likely dropped the idle keep-alive connection before
+            # any response arrived; retry once on a fresh one. Fresh
+            # connections and failures while reading the body are not retried.
+            close_http_connection(parts.scheme, parts.netloc)
+            conn = http_connection(parts.scheme, parts.netloc, timeout)
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+        return resp, resp.read()
+    except Exception:
+        close_http_connection(parts.scheme, parts.netloc)
+        raise
+
+
+def json_loads(data: Union[bytes, str]):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def fetch_json(url: str, user_agent: str, timeout: int = 30) -> Dict:
+    resp, body = http_get(urllib.parse.urlsplit(url), timeout, user_agent)
+    # Redirects are not followed; report them like errors instead of
+    # failing to decode the redirect body as JSON.
+    if resp.status >= 300:
+        raise urllib.error.HTTPError(
+            url, resp.status, resp.reason, resp.headers, None
         )
-    except ValueError:
-        min_dist = 50.0
-    sampled = downsample(points, min_dist)
-    while len(sampled) > target_max:
-        min_dist *= 1.5
-        sampled = downsample(points, min_dist)
-    return sampled
-
-
-def fetch_json(url: str, timeout: int = 20) -> Dict:
-    req = urllib.request.Request(
-        url,
-        headers={"User-Agent": USER_AGENT},
-        method="GET",
-    )
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+    if resp.getheader("Content-Encoding", "").lower() == "gzip":
+        body = gzip.decompress(body)
+    return json_loads(body)
 
 
-def reverse_geocode_nominatim(point: Point, zoom: int = 18) -> Dict:
+def reverse_geocode_nominatim(point: Point, user_agent: str, zoom: int = 18) -> Dict:
     params = {
         "format": "jsonv2",
         "lat": f"{point.lat:.7f}",
         "lon": f"{point.lon:.7f}",
         "zoom": str(zoom),
         "addressdetails": "1",
-        "extratags": "1",
-        "namedetails": "1",
     }
     url = "https://nominatim.openstreetmap.org/reverse?" + urllib.parse.urlencode(
         params
     )
-    return fetch_json(url)
+    return fetch_json(url, user_agent)
 
 
-def reverse_geocode_photon(point: Point) -> Dict:
+def reverse_geocode_photon(point: Point, user_agent: str) -> Dict:
     params = {
         "lat": f"{point.lat:.7f}",
         "lon": f"{point.lon:.7f}",
     }
     url = "https://photon.komoot.io/reverse?" + urllib.parse.urlencode(params)
-    data = fetch_json(url)
+    data = fetch_json(url, user_agent)
     features = data.get("features") or []
     if not features:
         return {}
@@ -571,130 +1009,430 @@ def normalize_photon(feature: Dict) -> Dict:
     }
 
 
-def reverse_geocode(point: Point, zoom: int = 18) -> Dict:
-    if GEOCODER == "photon":
-        return normalize_photon(reverse_geocode_photon(point))
-    return reverse_geocode_nominatim(point, zoom=zoom)
+GeocodeKey = Tuple[str, float, float, int]
+
+
+class GeocodeCache:
+    # Recently used results live in a bounded in-process LRU; older ones are
+    # looked up in the SQLite file by primary key on demand.
+    def __init__(self, path: Optional[str], maxsize: int = 4096) -> None:
+        self.entries: OrderedDict[GeocodeKey, Dict] = OrderedDict()
+        self.maxsize = maxsize
+        self.conn: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            # Every put is its own commit; WAL with NORMAL sync makes those
+            # appends instead of full journal rewrites plus fsyncs, and lets
+            # a second run read while another one writes.
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "provider TEXT, lat REAL, lon REAL, zoom INTEGER, data TEXT, "
+                "PRIMARY KEY (provider, lat, lon, zoom))"
+            )
+        except (OSError, sqlite3.Error):
+            # Fall back to an in-memory cache for this run.
+            self.conn = None
+
+    def _remember(self, key: GeocodeKey, data: Dict) -> None:
+        self.entries[key] = data
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def get(self, key: GeocodeKey) -> Optional[Dict]:
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+                return data
+            if self.conn is None:
+                return None
+            try:
+                row = self.conn.execute(
+                    "SELECT data FROM geocode "
+                    "WHERE provider = ? AND lat = ? AND lon = ? AND zoom = ?",
+                    key,
+                ).fetchone()
+                if row is None:
+                    return None
+                data = json_loads(row[0])
+            except (sqlite3.Error, ValueError):
+                return None
+            self._remember(key, data)
+            return data
+
+    def put(self, key: GeocodeKey, data: Dict) -> None:
+        with self.lock:
+            self._remember(key, data)
+            if self.conn is None:
+                return
+            try:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?)",
+                        (*key, json.dumps(data, ensure_ascii=False)),
+                    )
+            except sqlite3.Error:
+                self.conn = None
+
+
+_geocode_cache: Optional[GeocodeCache] = None
+
+
+def geocode_cache() -> GeocodeCache:
+    global _geocode_cache
+    if _geocode_cache is None:
+        enabled = env_first(["TRACK2TEXT_GEOCODE_CACHE"], "1") != "0"
+        _geocode_cache = GeocodeCache(GEOCODE_CACHE_PATH if enabled else None)
+    return _geocode_cache
+
+
+def geocode_key(provider: str, point: Point, zoom: int) -> GeocodeKey:
+    # Photon ignores the zoom level, so all its lookups share one key.
+    # Four decimals are roughly ten meters, so near-identical samples collide.
+    return (
+        provider,
+        round(point.lat, 4),
+        round(point.lon, 4),
+        zoom if provider == "nominatim" else 0,
+    )
+
+
+def cached_geocode(provider: str, point: Point, zoom: int, user_agent: str) -> Dict:
+    cache = geocode_cache()
+    key = geocode_key(provider, point, zoom)
+    data = cache.get(key)
+    if data is None:
+        if provider == "photon":
+            data = normalize_photon(reverse_geocode_photon(point, user_agent))
+        else:
+            wait_for_nominatim()
+            data = reverse_geocode_nominatim(point, user_agent, zoom=zoom)
+        cache.put(key, data)
+    return data
+
 
+NOMINATIM_INTERVAL_S = 1.0
+_nominatim_lock = threading.Lock()
+_nominatim_last = 0.0
 
-def reverse_geocode_locality(point: Point, zoom: int = 12) -> Dict:
-    if LOCALITY_GEOCODER == "photon":
-        return normalize_photon(reverse_geocode_photon(point))
-    return reverse_geocode_nominatim(point, zoom=zoom)
+
+def wait_for_nominatim() -> None:
+    # Nominatim usage policy: at most one request per second. Only cache
+    # misses get here, so cached lookups never wait.
+    global _nominatim_last
+    with _nominatim_lock:
+        delay = _nominatim_last + NOMINATIM_INTERVAL_S - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        _nominatim_last = time.monotonic()
+
+
+def reverse_geocode(point: Point, settings: Settings, zoom: int = 18) -> Dict:
+    return cached_geocode(settings.geocoder, point, zoom, settings.user_agent)
+
+
+def reverse_geocode_locality(point: Point, settings: Settings) -> Dict:
+    return cached_geocode(
+        settings.locality_geocoder,
+        point,
+        settings.locality_zoom,
+        settings.user_agent,
+    )
+
+
+GeocodeResult = Union[Dict, Exception]
+
+
+def _geocode_or_error(point: Point, settings: Settings) -> GeocodeResult:
+    try:
+        return reverse_geocode(point, settings)
+    except Exception as exc:
+        return exc
+
+
+def _locality_or_error(point: Point, settings: Settings) -> GeocodeResult:
+    try:
+        return reverse_geocode_locality(point, settings)
+    except Exception as exc:
+        return exc
+
+
+def needs_locality_context(result: GeocodeResult, zoom: int) -> bool:
+    # Skip the coarser lookup when the fine one already named both.
+    if not zoom or isinstance(result, Exception):
+        return False
+    _, locality, ortsteil = pick_all(result.get("address", {}))
+    return not (locality and ortsteil)
+
+
+def _geocode_sample(
+    point: Point, settings: Settings, with_context: bool
+) -> Tuple[GeocodeResult, Optional[GeocodeResult]]:
+    result = _geocode_or_error(point, settings)
+    context = None
+    if with_context and needs_locality_context(result, settings.locality_zoom):
+        context = _locality_or_error(point, settings)
+    return result, context
+
+
+def geocode_samples(
+    sampled: List[Point], settings: Settings, context_indices: Iterable[int] = ()
+) -> Iterator[Tuple[GeocodeResult, Optional[GeocodeResult]]]:
+    # Yields (result, locality context) per sample, in order; results may be
+    # the raised exception. Context is only looked up for context_indices.
+    # Samples within the same ~10 m grid cell, or closer than
+    # min_dist_m_geocode to the last queried sample, share its result unless
+    # that lookup failed.
+    cells = [(round(p.lat, 4), round(p.lon, 4)) for p in sampled]
+    context_indices = set(context_indices)
+    geocode_cache()
+    # Photon has no 1 request/s policy, so lookups run concurrently. Nominatim
+    # gets one worker that fetches ahead, paced by wait_for_nominatim, while
+    # the caller is still busy with earlier samples.
+    workers = 8 if settings.geocoder == "photon" else 1
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {}
+        keys = []
+        anchor: Optional[Point] = None
+        for idx, (cell, p) in enumerate(zip(cells, sampled)):
+            with_context = idx in context_indices
+            if (
+                anchor is not None
+                and not with_context
+                and haversine_m(anchor, p) < settings.min_dist_m_geocode
+            ):
+                keys.append(keys[-1])
+                continue
+            anchor = p
+            key = (cell, with_context)
+            keys.append(key)
+            if key not in futures:
+                futures[key] = executor.submit(_geocode_sample, p, settings, key[1])
+        for cell, p, key in zip(cells, sampled, keys):
+            result = futures[key].result()
+            if isinstance(result[0], Exception) and key[0] != cell:
+                # Don't copy a failed anchor; look this sample up on its own.
+                own_key = (cell, False)
+                if own_key not in futures:
+                    futures[own_key] = executor.submit(
+                        _geocode_sample, p, settings, False
+                    )
+                result = futures[own_key].result()
+            yield result
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+ROAD_KEYS = (
+    "road",
+    "pedestrian",
+    "cycleway",
+    "path",
+    "footway",
+    "steps",
+    "track",
+    "bridleway",
+)
+LOCALITY_KEYS = ("city", "town", "village", "suburb", "hamlet", "municipality")
+ORTSTEIL_KEYS = (
+    "neighbourhood",
+    "quarter",
+    "locality",
+    "borough",
+    "city_district",
+    "district",
+    "municipality",
+    "isolated_dwelling",
+)
+
+
+# Key -> rank; the key order above encodes the priority.
+ROAD_PRIORITY = {key: rank for rank, key in enumerate(ROAD_KEYS)}
+LOCALITY_PRIORITY = {key: rank for rank, key in enumerate(LOCALITY_KEYS)}
+ORTSTEIL_PRIORITY = {key: rank for rank, key in enumerate(ORTSTEIL_KEYS)}
+
+
+def pick_first(address: Dict, priority: Dict[str, int]) -> Optional[str]:
+    # One pass over the (short) address instead of one probe per key.
+    best_rank = len(priority)
+    best = None
+    for key, value in address.items():
+        rank = priority.get(key)
+        if rank is not None and rank < best_rank and value is not None:
+            best_rank = rank
+            best = value
+    return best
 
 
 def pick_road(address: Dict) -> Optional[str]:
-    for key in (
-        "road",
-        "pedestrian",
-        "cycleway",
-        "path",
-        "footway",
-        "steps",
-        "track",
-        "bridleway",
-    ):
-        if key in address:
-            return address[key]
-    return None
-
-
-def route_distance_m(points: List[Point]) -> float:
-    if len(points) < 2:
-        return 0.0
-    total = 0.0
-    for a, b in zip(points, points[1:]):
-        total += haversine_m(a, b)
-    return total
+    return pick_first(address, ROAD_PRIORITY)
+
+
+def route_distance_m(track: Track) -> float:
+    return math.fsum(segment_distances_m(track))
 
 
 def pick_locality(address: Dict) -> Optional[str]:
-    for key in ("city", "town", "village", "suburb", "hamlet", "municipality"):
-        if key in address:
-            return address[key]
-    return None
+    return pick_first(address, LOCALITY_PRIORITY)
 
 
 def pick_ortsteil(address: Dict) -> Optional[str]:
-    for key in (
-        "neighbourhood",
-        "quarter",
-        "locality",
-        "borough",
-        "city_district",
-        "district",
-        "municipality",
-        "isolated_dwelling",
-    ):
-        if key in address:
-            return address[key]
-    return None
+    return pick_first(address, ORTSTEIL_PRIORITY)
+
+
+@lru_cache(maxsize=1024)
+def _pick_all(
+    items: Tuple[Tuple[str, str], ...]
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    address = dict(items)
+    return pick_road(address), pick_locality(address), pick_ortsteil(address)
+
+
+def pick_all(address: Dict) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    # Neighboring samples often get the very same address back.
+    try:
+        return _pick_all(tuple(address.items()))
+    except TypeError:
+        return pick_road(address), pick_locality(address), pick_ortsteil(address)
+
+
+@dataclass(frozen=True)
+class Settings:
+    target_max: int = 200
+    section_km: float = 3.0
+    locality_zoom: int = 12
+    include_start_goal: bool = True
+    min_dist_m: float = 50.0
+    min_dist_m_geocode: float = 50.0
+    geocoder: str = "nominatim"
+    locality_geocoder: str = "photon"
+    user_agent: str = DEFAULT_USER_AGENT
+
+    @classmethod
+    def from_env(cls, config: Optional[Dict[str, str]] = None) -> Settings:
+        # Environment variables (also set by the CLI flags) win over
+        # config.txt, which wins over the defaults.
+        config = config or {}
+        defaults = cls()
+
+        def value(keys: List[str], default) -> str:
+            return env_first(keys, config.get(keys[0], str(default)))
+
+        def number(keys: List[str], default, cast):
+            try:
+                return cast(value(keys, default))
+            except ValueError:
+                return default
+
+        min_dist_m = number(
+            ["TRACK2TEXT_MIN_DIST_M", "GPXER_MIN_DIST_M"], defaults.min_dist_m, float
+        )
+        return cls(
+            target_max=number(
+                ["TRACK2TEXT_MAX_SAMPLES", "GPXER_MAX_SAMPLES"],
+                defaults.target_max,
+                int,
+            ),
+            section_km=number(
+                ["TRACK2TEXT_SECTION_KM", "GPXER_SECTION_KM"],
+                defaults.section_km,
+                float,
+            ),
+            locality_zoom=number(
+                ["TRACK2TEXT_LOCALITY_ZOOM", "GPXER_LOCALITY_ZOOM"],
+                defaults.locality_zoom,
+                int,
+            ),
+            include_start_goal=value(
+                ["TRACK2TEXT_INCLUDE_START_GOAL", "GPXER_INCLUDE_START_GOAL"], "1"
+            )
+            == "1",
+            min_dist_m=min_dist_m,
+            # Reusing results over more than the sample spacing would hide
+            # road changes that the spacing was chosen to catch.
+            min_dist_m_geocode=number(
+                ["TRACK2TEXT_MIN_DIST_M_GEOCODE"],
+                min(min_dist_m, defaults.min_dist_m_geocode),
+                float,
+            ),
+            geocoder=value(
+                ["TRACK2TEXT_GEOCODER", "GPXER_GEOCODER"], defaults.geocoder
+            ).lower(),
+            locality_geocoder=value(
+                ["TRACK2TEXT_LOCALITY_GEOCODER", "GPXER_LOCALITY_GEOCODER"],
+                defaults.locality_geocoder,
+            ).lower(),
+            user_agent=value(["NOMINATIM_USER_AGENT"], defaults.user_agent),
+        )
 
 
 def build_description(
-    points: List[Point],
+    track: Track,
     total_dist_m: float,
     lang: str,
+    settings: Optional[Settings] = None,
 ) -> Tuple[List[str], int]:
-    try:
-        target_max = int(
-            env_first(["TRACK2TEXT_MAX_SAMPLES", "GPXER_MAX_SAMPLES"], "200")
-        )
-    except ValueError:
-        target_max = 200
-    try:
-        section_km = float(
-            env_first(["TRACK2TEXT_SECTION_KM", "GPXER_SECTION_KM"], "3")
-        )
-    except ValueError:
-        section_km = 3.0
-    try:
-        locality_zoom = int(
-            env_first(["TRACK2TEXT_LOCALITY_ZOOM", "GPXER_LOCALITY_ZOOM"], "12")
-        )
-    except ValueError:
-        locality_zoom = 12
-    include_start_goal = (
-        env_first(
-            ["TRACK2TEXT_INCLUDE_START_GOAL", "GPXER_INCLUDE_START_GOAL"], "1"
-        )
-        == "1"
+    if settings is None:
+        settings = Settings.from_env()
+    cumulative = cumulative_distances_m(track)
+    if cumulative and cumulative[-1] > 0 and total_dist_m > 0:
+        # The cheap-ruler sums drift slightly from the reported haversine
+        # total; rescale them so progress and section km agree with it.
+        scale = total_dist_m / cumulative[-1]
+        cumulative = [d * scale for d in cumulative]
+    sample_idx = sample_indices(
+        track,
+        cumulative,
+        target_max=settings.target_max,
+        min_dist_m=settings.min_dist_m,
+        section_m=settings.section_km * 1000.0,
     )
-    sampled = sample_points(points, target_max=target_max)
+    sampled = [track.point(i) for i in sample_idx]
 
     use_color = color_enabled()
     started_at = time.monotonic()
     print(
         colorize("Starting processing:", "cyan", use_color),
-        f"raw points={len(points)}, samples={len(sampled)},",
-        f"target_max={target_max}, section_km={section_km}",
+        f"raw points={len(track)}, samples={len(sampled)},",
+        f"target_max={settings.target_max}, section_km={settings.section_km}",
     )
 
     lines = []
     last_road = None
     last_locality = None
     last_ortsteil = None
-    cumulative_m = 0.0
-    next_section_m = section_km * 1000.0 if section_km > 0 else float("inf")
-
-    for idx, p in enumerate(sampled):
-        if idx > 0:
+    # Distances along the full track, not between the (sparser) samples.
+    sample_cumulative = [cumulative[i] for i in sample_idx]
+    breaks = section_breaks(sample_cumulative, settings.section_km * 1000.0)
+    pending_section_km: Optional[int] = None
+
+    # Locality context for the start and section markers is fetched along
+    # with the samples instead of inline.
+    context_indices = set(breaks)
+    if settings.include_start_goal:
+        context_indices.add(0)
+    results = geocode_samples(sampled, settings, context_indices)
+    progress_label = colorize("Progress:", "green", use_color)
+    failed_label = colorize("Reverse geocoding failed:", "red", use_color)
+    sample_total = len(sampled)
+    total_km = f"{total_dist_m / 1000:.2f}"
+    for idx, (p, (result, context)) in enumerate(zip(sampled, results)):
+        cumulative_m = sample_cumulative[idx]
+        if idx in breaks:
+            pending_section_km = breaks[idx]
+        if isinstance(result, Exception):
+            exc = result
             print(
-                colorize(
-                    "Waiting 1s to respect reverse geocoding usage policy.",
-                    "blue",
-                    use_color,
-                )
-            )
-            time.sleep(1.0)  # Nominatim usage policy
-            cumulative_m += haversine_m(sampled[idx - 1], p)
-        try:
-            data = reverse_geocode(p, zoom=18)
-        except Exception as exc:
-            print(
-                colorize("Reverse geocoding failed:", "red", use_color),
-                f"sample {idx + 1}/{len(sampled)},",
-                f"coords={p.lat:.6f},{p.lon:.6f}, error={exc}",
+                f"{failed_label} sample {idx + 1}/{sample_total}, "
+                f"coords={p.lat:.6f},{p.lon:.6f}, error={exc}"
             )
             lines.append(
                 (
@@ -705,11 +1443,8 @@ def build_description(
             )
             continue
 
-        address = data.get("address", {})
-        road = pick_road(address)
-        locality = pick_locality(address)
-        ortsteil = pick_ortsteil(address)
-        progress_pct = (idx + 1) / len(sampled) * 100.0
+        road, locality, ortsteil = pick_all(result.get("address", {}))
+        progress_pct = (idx + 1) / sample_total * 100.0
         dist_pct = (cumulative_m / total_dist_m * 100.0) if total_dist_m else 0.0
         road_label = road or "unknown road"
         locality_label = locality or "unknown locality"
@@ -718,19 +1453,19 @@ def build_description(
         eta = None
         if idx >= 0:
             avg_per = elapsed / (idx + 1)
-            remaining = avg_per * (len(sampled) - idx - 1)
+            remaining = avg_per * (sample_total - idx - 1)
             eta = format_duration(remaining)
         eta_part = f", eta≈{eta}" if eta else ""
         print(
-            colorize("Progress:", "green", use_color),
-            f"sample {idx + 1}/{len(sampled)} ({progress_pct:.1f}%),",
-            f"distance≈{cumulative_m/1000:.2f} km of {total_dist_m/1000:.2f} km",
-            f"({dist_pct:.1f}%){eta_part}, coords={p.lat:.6f},{p.lon:.6f},",
-            f"road='{road_label}', locality='{locality_label}', district='{ortsteil_label}'",
+            f"{progress_label} sample {idx + 1}/{sample_total} ({progress_pct:.1f}%), "
+            f"distance≈{cumulative_m / 1000:.2f} km of {total_km} km "
+            f"({dist_pct:.1f}%){eta_part}, coords={p.lat:.6f},{p.lon:.6f}, "
+            f"road='{road_label}', locality='{locality_label}', "
+            f"district='{ortsteil_label}'"
         )
 
-        if cumulative_m >= next_section_m:
-            km_marker = int(next_section_m / 1000.0)
+        if pending_section_km is not None:
+            km_marker = pending_section_km
             title = (
                 f"Abschnitt: ab km {km_marker}"
                 if lang == "DE"
@@ -738,21 +1473,11 @@ def build_description(
             )
             section_locality = locality
             section_ortsteil = ortsteil
-            if locality_zoom:
-                print(
-                    colorize(
-                        "Fetching locality context for section marker.",
-                        "yellow",
-                        use_color,
-                    )
-                )
-                time.sleep(1.0)
-                try:
-                    loc_data = reverse_geocode_locality(p, zoom=locality_zoom)
-                    loc_address = loc_data.get("address", {})
-                    section_locality = pick_locality(loc_address) or section_locality
-                    section_ortsteil = pick_ortsteil(loc_address) or section_ortsteil
-                except Exception:
+            if needs_locality_context(result, settings.locality_zoom):
+                if context is None:
+                    # The marker moved past a failed sample; fetch it now.
+                    context = _locality_or_error(p, settings)
+                if isinstance(context, Exception):
                     print(
                         colorize(
                             "Locality reverse geocoding failed for section marker.",
@@ -760,7 +1485,10 @@ def build_description(
                             use_color,
                         )
                     )
-                    pass
+                else:
+                    _, loc, ort = pick_all(context.get("address", {}))
+                    section_locality = loc or section_locality
+                    section_ortsteil = ort or section_ortsteil
             if section_locality:
                 title += (
                     f" (Ort: {section_locality})"
@@ -774,7 +1502,7 @@ def build_description(
                     else f", District: {section_ortsteil}"
                 )
             lines.append(f"- {title}")
-            next_section_m += section_km * 1000.0
+            pending_section_km = None
             last_locality = section_locality
             last_ortsteil = section_ortsteil
 
@@ -785,30 +1513,19 @@ def build_description(
                 last_locality = locality
             if ortsteil:
                 last_ortsteil = ortsteil
-            if include_start_goal:
-                if locality_zoom:
+            if settings.include_start_goal:
+                if isinstance(context, Exception):
                     print(
                         colorize(
-                            "Fetching locality context for start marker.",
-                            "yellow",
+                            "Locality reverse geocoding failed for start marker.",
+                            "red",
                             use_color,
                         )
                     )
-                    time.sleep(1.0)
-                    try:
-                        loc_data = reverse_geocode_locality(p, zoom=locality_zoom)
-                        loc_address = loc_data.get("address", {})
-                        last_locality = pick_locality(loc_address) or last_locality
-                        last_ortsteil = pick_ortsteil(loc_address) or last_ortsteil
-                    except Exception:
-                        print(
-                            colorize(
-                                "Locality reverse geocoding failed for start marker.",
-                                "red",
-                                use_color,
-                            )
-                        )
-                        pass
+                elif context is not None:
+                    _, loc, ort = pick_all(context.get("address", {}))
+                    last_locality = loc or last_locality
+                    last_ortsteil = ort or last_ortsteil
                 start_entry = "- Start" if lang == "DE" else "- Start"
                 if road:
                     start_entry += f": {road}"
@@ -859,7 +1576,7 @@ def build_description(
         if road:
             last_road = road
 
-    if include_start_goal and sampled:
+    if settings.include_start_goal and sampled:
         goal_entry = "- Ziel" if lang == "DE" else "- Finish"
         if last_road:
             goal_entry += f": {last_road}"
@@ -884,20 +1601,25 @@ def build_description(
 
     return lines, len(sampled)
 
+CONFIG_LINE_RE = re.compile(r"^[ \t]*([^#=\s][^=\n]*?)[ \t]*=[ \t]*(.*?)[ \t]*$", re.M)
+
+
 def load_config(path: str) -> Dict[str, str]:
     if not os.path.exists(path):
         return {}
-    config = {}
     with open(path, "r", encoding="utf-8") as f:
-        for raw_line in f:
-            line = raw_line.strip()
-            if not line or line.startswith("#") or "=" not in line:
-                continue
-            key, value = line.split("=", 1)
-            config[key.strip()] = value.strip()
+        text = f.read()
+    config = {}
+    for m in CONFIG_LINE_RE.finditer(text):
+        value = m.group(2)
+        # KEY="some value" as documented in config.txt; keep the inner text.
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        config[m.group(1)] = value
     return config
 
 
+@lru_cache(maxsize=None)
 def normalize_output_language(value: Optional[str]) -> str:
     if not value:
         return "DE"
@@ -922,6 +1644,88 @@ def resolve_input_path(value: Optional[str]) -> Optional[str]:
     return os.path.join(INBOX_DIR, value)
 
 
+HEADER_TEMPLATES = {
+    "DE": (
+        "Rohfassung Wegbeschreibung\n"
+        "=======================\n\n"
+        "Hinweis: Diese Liste ist eine Rohfassung. Bitte mit ChatGPT zu einer\n"
+        "gut lesenden Wegbeschreibung zusammenfassen.\n\n"
+        "Format: Stichpunkte mit Straßenwechseln und Ortsangaben.\n"
+        "Abschnitte: automatisch nach Distanz gegliedert.\n\n"
+        "Rohdaten: Trackpunkte={points}, Samples={samples}, Distanz≈{km:.2f} km\n\n"
+        "Quelle: {src}\n\n"
+    ),
+    "EN": (
+        "Draft Route Description\n"
+        "=======================\n\n"
+        "Note: This list is a draft. Please summarize it into a readable\n"
+        "route description (e.g. with ChatGPT).\n\n"
+        "Format: bullets with road changes and place names.\n"
+        "Sections: automatically grouped by distance.\n\n"
+        "Raw data: track points={points}, samples={samples}, "
+        "distance≈{km:.2f} km\n\n"
+        "Source: {src}\n\n"
+    ),
+}
+
+SUMMARY_LABELS = {
+    "EN": {
+        "title": "Summary at a glance",
+        "distance": "Distance",
+        "track_points": "Track points",
+        "samples": "Samples",
+        "total_time": "Total time",
+        "ascent": "Ascent",
+        "descent": "Descent",
+        "max_grade": "Max grade",
+        "max_altitude": "Max altitude",
+        "avg_power": "Average power",
+        "speed_avg_max": "Speed (avg/max)",
+        "heart_rate_avg_max": "Heart rate (avg/max)",
+        "avg_cadence": "Average cadence",
+        "temperature_min_max_avg": "Temperature (min/max/avg)",
+    },
+    "DE": {
+        "title": "Kurzueberblick",
+        "distance": "Distanz",
+        "track_points": "Trackpunkte",
+        "samples": "Samples",
+        "total_time": "Gesamte Zeit",
+        "ascent": "Anstieg",
+        "descent": "Abstieg",
+        "max_grade": "Max. Anstieg",
+        "max_altitude": "Max. Hoehe",
+        "avg_power": "Durchschnittliche Watt",
+        "speed_avg_max": "Geschwindigkeit (avg/max)",
+        "heart_rate_avg_max": "Puls (avg/max)",
+        "avg_cadence": "Durchschnittliche Kadenz",
+        "temperature_min_max_avg": "Temperatur (min/max/avg)",
+    },
+}
+
+SUMMARY_FIT_KEYS = (
+    "total_time",
+    "ascent",
+    "descent",
+    "max_grade",
+    "max_altitude",
+    "avg_power",
+    "speed_avg_max",
+    "avg_cadence",
+    "temperature_min_max_avg",
+)
+# (key, label) pairs per language, in output order.
+SUMMARY_FIT_ROWS = {
+    lang: tuple((key, labels[key]) for key in SUMMARY_FIT_KEYS)
+    for lang, labels in SUMMARY_LABELS.items()
+}
+
+ROUTE_DETAILS_HEADING = {
+    lang: f"{title}\n{'-' * len(title)}\n"
+    for lang, title in (("EN", "Route Details"), ("DE", "Strecken-Details"))
+}
+
+
 def summary_at_glance(
     lang: str,
     track_points: int,
@@ -929,55 +1733,38 @@ def summary_at_glance(
     total_dist_m: float,
     fit_summary_data: Optional[Dict[str, object]],
 ) -> List[str]:
-    title = "Summary at a glance" if lang == "EN" else "Kurzueberblick"
+    labels = SUMMARY_LABELS[lang]
+    title = labels["title"]
     lines = [title, "-" * len(title)]
-    lines.append(
-        ("Distance: " if lang == "EN" else "Distanz: ")
-        + f"{total_dist_m/1000:.2f} km"
-    )
-    lines.append(
-        ("Track points: " if lang == "EN" else "Trackpunkte: ")
-        + f"{track_points}"
-    )
-    lines.append(("Samples: " if lang == "EN" else "Samples: ") + f"{samples}")
-    if fit_summary_data:
-        label_map = {
-            "total_time": ("Total time", "Gesamte Zeit"),
-            "ascent": ("Ascent", "Anstieg"),
-            "descent": ("Descent", "Abstieg"),
-            "max_grade": ("Max grade", "Max. Anstieg"),
-            "max_altitude": ("Max altitude", "Max. Hoehe"),
-            "avg_power": ("Average power", "Durchschnittliche Watt"),
-            "distance": ("Distance", "Distanz"),
-            "speed_avg_max": ("Speed (avg/max)", "Geschwindigkeit (avg/max)"),
-            "heart_rate_avg_max": ("Heart rate (avg/max)", "Puls (avg/max)"),
-            "avg_cadence": ("Average cadence", "Durchschnittliche Kadenz"),
-            "temperature_min_max_avg": (
-                "Temperature (min/max/avg)",
-                "Temperatur (min/max/avg)",
-            ),
-        }
-        for key in (
-            "total_time",
-            "ascent",
-            "descent",
-            "max_grade",
-            "max_altitude",
-            "avg_power",
-            "speed_avg_max",
-            "avg_cadence",
-            "temperature_min_max_avg",
-        ):
-            value = fit_summary_data.get(key)
-            if not value:
-                continue
-            label_en, label_de = label_map[key]
-            label = label_en if lang == "EN" else label_de
+    lines.append(f"{labels['distance']}: {total_dist_m/1000:.2f} km")
+    lines.append(f"{labels['track_points']}: {track_points}")
+    lines.append(f"{labels['samples']}: {samples}")
+    if not fit_summary_data:
+        # GPX input: nothing from FIT to add.
+        lines.append("")
+        return lines
+    for key, label in SUMMARY_FIT_ROWS[lang]:
+        value = fit_summary_data.get(key)
+        if value:
             lines.append(f"{label}: {value}")
     lines.append("")
     return lines
 
 
+def _write_txt(path: Path, text: str) -> None:
+    with open(path, "w", encoding="utf-8", buffering=1 << 16) as f:
+        f.write(text)
+
+
+def _write_json(path: Path, payload: Dict[str, object]) -> None:
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(payload, ensure_ascii=False, indent=2))
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Create a route description from the newest GPX/FIT in inbox/."
@@ -1016,10 +1803,20 @@ def main() -> int:
         "--TRACK2TEXT_MIN_DIST_M",
         help="Override min distance between samples (same as TRACK2TEXT_MIN_DIST_M env var).",
     )
+    parser.add_argument(
+        "--TRACK2TEXT_MIN_DIST_M_GEOCODE",
+        help="Reuse the previous geocoding result for samples closer than this "
+        "(same as TRACK2TEXT_MIN_DIST_M_GEOCODE env var).",
+    )
     parser.add_argument(
         "--file",
         help="Process a specific GPX/FIT file (absolute or relative path, or filename in inbox/).",
     )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Add a debug section listing all FIT fields per message type.",
+    )
     parser.add_argument(
         "--quick-test",
         action="store_true",
@@ -1073,12 +1870,21 @@ def main() -> int:
         os.environ["TRACK2TEXT_LOCALITY_ZOOM"] = args.TRACK2TEXT_LOCALITY_ZOOM
     if args.TRACK2TEXT_MIN_DIST_M is not None:
         os.environ["TRACK2TEXT_MIN_DIST_M"] = args.TRACK2TEXT_MIN_DIST_M
+    if args.TRACK2TEXT_MIN_DIST_M_GEOCODE is not None:
+        os.environ["TRACK2TEXT_MIN_DIST_M_GEOCODE"] = (
+            args.TRACK2TEXT_MIN_DIST_M_GEOCODE
+        )
     if args.NOMINATIM_USER_AGENT is not None:
         os.environ["NOMINATIM_USER_AGENT"] = args.NOMINATIM_USER_AGENT
     config = load_config(CONFIG_PATH)
     lang = normalize_output_language(
         args.output_language or config.get("output_language")
     )
+    use_color = color_enabled()
+    done_prefix = colorize(
+        ("Fertig: " if lang == "DE" else "Done: "), "cyan", use_color
+    )
+    json_prefix = colorize("JSON: ", "cyan", use_color)
 
     try:
         input_path = resolve_input_path(
@@ -1092,97 +1898,69 @@ def main() -> int:
         fit_summary_data: Dict[str, object] = {}
         if ext == ".fit":
             (
-                points,
+                track,
                 fit_summary_lines,
                 fit_debug_lines,
                 fit_summary_data,
-            ) = parse_fit_points_and_summary(track_path, lang)
+            ) = parse_fit_points_and_summary(track_path, lang, args.debug)
         else:
-            points = parse_gpx_points(track_path)
-        if not points:
+            track = scan_gpx_points(track_path) or parse_gpx_points(track_path)
+        if not track:
             msg = (
                 "Fehler: Keine Track- oder Routenpunkte gefunden."
                 if lang == "DE"
                 else "Error: No track or route points found."
             )
-            use_color = color_enabled()
             print(colorize(msg, "red", use_color))
             return 1
 
-        total_dist_m = route_distance_m(points)
-        lines, sample_count = build_description(points, total_dist_m, lang)
-
-        base = os.path.splitext(os.path.basename(track_path))[0]
-        out_path = os.path.join(os.path.dirname(track_path), f"{base}.txt")
-        json_path = os.path.join(os.path.dirname(track_path), f"{base}.json")
-        with open(out_path, "w", encoding="utf-8") as f:
-            if lang == "DE":
-                f.write("Rohfassung Wegbeschreibung\n")
-                f.write("=" * 23 + "\n\n")
-                f.write(
-                    "Hinweis: Diese Liste ist eine Rohfassung. Bitte mit ChatGPT zu einer\n"
-                )
-                f.write("gut lesenden Wegbeschreibung zusammenfassen.\n\n")
-                f.write("Format: Stichpunkte mit Straßenwechseln und Ortsangaben.\n")
-                f.write("Abschnitte: automatisch nach Distanz gegliedert.\n\n")
-                f.write(f"Rohdaten: Trackpunkte={len(points)}, Samples={sample_count}, ")
-                f.write(f"Distanz≈{total_dist_m/1000:.2f} km\n\n")
-                f.write(f"Quelle: {os.path.basename(track_path)}\n\n")
-            else:
-                f.write("Draft Route Description\n")
-                f.write("=" * 23 + "\n\n")
-                f.write(
-                    "Note: This list is a draft. Please summarize it into a readable\n"
-                )
-                f.write("route description (e.g. with ChatGPT).\n\n")
-                f.write("Format: bullets with road changes and place names.\n")
-                f.write("Sections: automatically grouped by distance.\n\n")
-                f.write(f"Raw data: track points={len(points)}, samples={sample_count}, ")
-                f.write(f"distance≈{total_dist_m/1000:.2f} km\n\n")
-                f.write(f"Source: {os.path.basename(track_path)}\n\n")
-            overview_lines = summary_at_glance(
-                lang, len(points), sample_count, total_dist_m, fit_summary_data
-            )
-            f.write("\n".join(overview_lines))
-            if fit_summary_lines:
-                f.write("\n")
-                f.write("\n".join(fit_summary_lines))
-                f.write("\n\n")
-            if lines:
-                section_title = "Route Details" if lang == "EN" else "Strecken-Details"
-                f.write(section_title + "\n")
-                f.write("-" * len(section_title) + "\n")
-                f.write("\n".join(lines))
-                f.write("\n")
-            if fit_debug_lines:
-                f.write("\n\n")
-                f.write("\n".join(fit_debug_lines))
-                f.write("\n")
+        total_dist_m = route_distance_m(track)
+        lines, sample_count = build_description(
+            track, total_dist_m, lang, Settings.from_env(config)
+        )
+
+        source = Path(track_path)
+        out_path = source.with_suffix(".txt")
+        json_path = source.with_suffix(".json")
+        src_name = source.name
+        header = HEADER_TEMPLATES[lang].format(
+            points=len(track),
+            samples=sample_count,
+            km=total_dist_m / 1000,
+            src=src_name,
+        )
+        overview_lines = summary_at_glance(
+            lang, len(track), sample_count, total_dist_m, fit_summary_data
+        )
+        parts = [header, "\n".join(overview_lines)]
+        if fit_summary_lines:
+            parts.append("\n" + "\n".join(fit_summary_lines) + "\n\n")
+        if lines:
+            parts.append(ROUTE_DETAILS_HEADING[lang])
+            parts.append("\n".join(lines) + "\n")
+        if fit_debug_lines:
+            parts.append("\n\n" + "\n".join(fit_debug_lines) + "\n")
 
         json_payload = {
-            "source_file": os.path.basename(track_path),
+            "source_file": src_name,
             "output_language": lang,
-            "track_points": len(points),
+            "track_points": len(track),
             "samples": sample_count,
             "distance_km": round(total_dist_m / 1000.0, 3),
             "fit_summary": fit_summary_data or None,
             "route_lines": lines,
         }
-        with open(json_path, "w", encoding="utf-8") as jf:
-            json.dump(json_payload, jf, ensure_ascii=False, indent=2)
-
-        use_color = color_enabled()
-        print(
-            colorize(("Fertig: " if lang == "DE" else "Done: "), "cyan", use_color)
-            + out_path
-        )
-        print(
-            colorize(("JSON: " if lang == "EN" else "JSON: "), "cyan", use_color)
-            + json_path
-        )
+        # The two files are independent; write them side by side.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            txt_done = executor.submit(_write_txt, out_path, "".join(parts))
+            json_done = executor.submit(_write_json, json_path, json_payload)
+            txt_done.result()
+            json_done.result()
+
+        print(done_prefix + str(out_path))
+        print(json_prefix + str(json_path))
         return 0
     except KeyboardInterrupt:
-        use_color = color_enabled()
         msg = "Abbruch durch Benutzer." if lang == "DE" else "Aborted by user."
         print(colorize(msg, "yellow", use_color))
         return 130